@@ -1,56 +1,181 @@
 """
 Classification module for service call data
 """
+import asyncio
+import functools
+import hashlib
 import json
+import os
+import re
 import requests
+import socket
 import threading
+import numpy as np
 import pandas as pd
 from tqdm import tqdm
 from concurrent.futures import ThreadPoolExecutor, as_completed
 from pypac import PACSession, get_pac
+from urllib3.connection import HTTPConnection
+
+# httpx is optional: when available (and no PAC proxy is required) the
+# classifier fans out requests on a single event loop instead of threads.
+try:
+    import httpx
+except ImportError:
+    httpx = None
+
+# orjson is optional: noticeably faster encode/decode for the request
+# payloads and responses, which matters once batching grows their size.
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+if orjson is not None:
+    def _json_loads(data):
+        return orjson.loads(data)
+
+    def _json_dumps(obj, default=None):
+        return orjson.dumps(obj, default=default)
+else:
+    def _json_loads(data):
+        return json.loads(data)
+
+    def _json_dumps(obj, default=None):
+        return json.dumps(obj, default=default).encode('utf-8')
+
+
+# Markdown code fences some responses wrap around the JSON payload;
+# stripped in one pass rather than three .replace traversals
+_JSON_FENCE_RE = re.compile(r'^\s*```(?:json)?\s*|\s*```\s*$')
+
+
+# Disable Nagle batching for the small request bodies and give the
+# receive buffer headroom so responses arrive in few large reads rather
+# than many 16 KB ones.
+_SOCKET_OPTIONS = HTTPConnection.default_socket_options + [
+    (socket.IPPROTO_TCP, socket.TCP_NODELAY, 1),
+    (socket.SOL_SOCKET, socket.SO_RCVBUF, 131072),
+]
+
+
+class _TunedHTTPAdapter(requests.adapters.HTTPAdapter):
+    """HTTPAdapter applying the tuned socket options to its pool"""
+
+    def init_poolmanager(self, *args, **kwargs):
+        kwargs['socket_options'] = _SOCKET_OPTIONS
+        super().init_poolmanager(*args, **kwargs)
+
+
+@functools.lru_cache(maxsize=4)
+def _build_rules(part_failure_json):
+    """
+    Build the prompt rules block from serialized part_failure_data
+
+    Memoized on the JSON string so repeated pipeline initializations in a
+    long-running process rebuild the rules only when the taxonomy changes.
+    """
+    part_failure_data = json.loads(part_failure_json)
+    rule_lines = []
+    for part, data in part_failure_data.items():
+        failure_modes_str = "', '".join(data["failure_modes"])
+        fixes_str = "', '".join(data["fixes"])
+        rule_lines.append(
+            f"If Part = '{part}' → Failure Mode ∈ {{'{failure_modes_str}'}}; Fix ∈ {{'{fixes_str}'}}\n"
+        )
+    return "".join(rule_lines)
 
 
 class ServiceCallClassifier:
     """Handles classification of service call data"""
     
-    def __init__(self, part_failure_data, prompts, api_config, token):
+    def __init__(self, part_failure_data, prompts, api_config, token, cache_dir=None):
         """
         Initialize classifier
-        
+
         Args:
             part_failure_data: Dictionary of parts, failure modes, and fixes
             prompts: Dictionary with prompt templates
             api_config: API configuration dictionary
             token: Authentication token
+            cache_dir: Optional directory for on-disk response caching
         """
         self.part_failure_data = part_failure_data
         self.prompts = prompts
         self.api_config = api_config
         self.token = token
         self.lock = threading.Lock()
-        
+
+        # Build the prompt pieces once; they are identical for every call,
+        # so worker threads just read immutable strings.
+        self._system_prompt = self.generate_classification_prompt()
+        self._user_template = self.prompts.get('classification_user_message_template', '')
+
+        # Known category values for the taxonomy result columns; '' marks
+        # rows without that problem slot filled
+        self._part_categories = list(self.part_failure_data.keys()) + ['']
+        self._failure_categories = sorted(
+            {fm for d in self.part_failure_data.values() for fm in d['failure_modes']}
+        ) + ['']
+        self._fix_categories = sorted(
+            {fix for d in self.part_failure_data.values() for fix in d['fixes']}
+        ) + ['']
+
+        # Optional content-addressed response cache so re-runs over the
+        # same rows are served from disk instead of the API. The key covers
+        # the taxonomy and system prompt, so editing part_failure_data
+        # invalidates prior entries automatically.
+        self.cache_dir = cache_dir
+        if self.cache_dir:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            taxonomy_json = json.dumps(self.part_failure_data, sort_keys=True)
+            self._prompt_digest = hashlib.blake2b(
+                (taxonomy_json + '\x00' + self._system_prompt).encode('utf-8'),
+                digest_size=16
+            ).hexdigest()
+            print(f"✓ Response cache enabled: {self.cache_dir}")
+
         # Setup session with proxy if needed
         pac_url = api_config.get('pac_url')
+        self._uses_pac = False
         if pac_url:
             try:
                 pac = get_pac(url=pac_url)
                 self.session = PACSession(pac=pac)
+                self._uses_pac = True
                 print(f"✓ Configured PAC proxy")
             except Exception as e:
                 print(f"⚠ PAC proxy failed: {e}. Using regular session.")
                 self.session = requests.Session()
         else:
             self.session = requests.Session()
-    
+
+        # The default HTTPAdapter keeps only 10 pooled connections; with
+        # many worker threads hitting one host, warm TLS connections get
+        # evicted and rebuilt. Size the pool above the worker count and
+        # block instead of opening throwaway connections.
+        adapter = _TunedHTTPAdapter(
+            pool_connections=64,
+            pool_maxsize=64,
+            pool_block=True
+        )
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+
+        # Set auth headers once on the session instead of per request
+        self.session.headers.update({
+            "Authorization": f"Bearer {self.token}",
+            "Content-Type": "application/json",
+            "Connection": "keep-alive"
+        })
+
     def generate_classification_prompt(self):
         """Generate the classification prompt from current part_failure_data"""
-        # Build rules from part_failure_data
-        rules = ""
-        for part, data in self.part_failure_data.items():
-            failure_modes_str = "', '".join(data["failure_modes"])
-            fixes_str = "', '".join(data["fixes"])
-            rules += f"If Part = '{part}' → Failure Mode ∈ {{'{failure_modes_str}'}}; Fix ∈ {{'{fixes_str}'}}\n"
-        
+        # Key the memoized rules builder on the serialized taxonomy so
+        # re-initialized pipelines sharing the same data reuse the string
+        rules = _build_rules(json.dumps(self.part_failure_data))
+
         # Get template and insert rules
         template = self.prompts.get('classification_prompt_template', '')
         return template.format(rules=rules)
@@ -69,45 +194,139 @@ class ServiceCallClassifier:
         Returns:
             Dictionary with classification results
         """
-        url = self.api_config['endpoint']
-        system_prompt = self.generate_classification_prompt()
-        
-        # Format user message
-        user_template = self.prompts.get('classification_user_message_template', '')
-        user_message = user_template.format(
+        payload = self._build_payload(self._user_template.format(
             reason_for_service=reason_for_service,
             special_notes=special_notes,
             service_performed=service_performed,
             issue_reported=issue_reported
-        )
-        
-        payload = {
+        ))
+        return self._post_and_parse(self.api_config['endpoint'], payload)
+
+    def _build_payload(self, user_message):
+        """Build a chat completion payload for the given user message"""
+        return {
             "model": self.api_config.get('model', 'gpt-4o'),
             "messages": [
-                {"role": "system", "content": system_prompt},
+                {"role": "system", "content": self._system_prompt},
                 {"role": "user", "content": user_message}
             ],
-            "temperature": self.api_config.get('temperature', 0.1)
-        }
-        
-        headers = {
-            "Authorization": f"Bearer {self.token}",
-            "Content-Type": "application/json"
+            "temperature": self.api_config.get('temperature', 0.1),
+            # Strict JSON mode: the model cannot wrap the result in prose
+            # or code fences, so parse-failure retries disappear
+            "response_format": {"type": "json_object"}
         }
-        
-        response = self.session.post(url, json=payload, headers=headers)
-        
+
+    def _parse_chat_data(self, data):
+        """Extract and parse the JSON content from a chat completion body"""
+        content = data["choices"][0]["message"]["content"]
+
+        # Clean JSON markers if present
+        if '```' in content:
+            content = _JSON_FENCE_RE.sub('', content)
+
+        return _json_loads(content)
+
+    def _cache_path(self, payload):
+        """Cache file path for a payload, keyed on prompt + user message"""
+        user_message = payload["messages"][1]["content"]
+        key = hashlib.blake2b(
+            (self._prompt_digest + '\x00' + user_message).encode('utf-8'),
+            digest_size=16
+        ).hexdigest()
+        return os.path.join(self.cache_dir, f'{key}.json')
+
+    def _cache_get(self, payload):
+        """Return the cached parsed result for payload, or None"""
+        if not self.cache_dir:
+            return None
+        path = self._cache_path(payload)
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError, OSError):
+            return None
+
+    def _cache_put(self, payload, parsed):
+        """Atomically store a parsed result for payload"""
+        if not self.cache_dir:
+            return
+        path = self._cache_path(payload)
+        tmp_path = f'{path}.tmp'
+        try:
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(parsed, f, ensure_ascii=False)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            print(f"⚠ Could not write cache entry: {e}")
+
+    def _post_and_parse(self, url, payload):
+        """POST a chat payload and return the parsed JSON content"""
+        cached = self._cache_get(payload)
+        if cached is not None:
+            return cached
+
+        response = self.session.post(url, data=_json_dumps(payload))
+
         if response.status_code == 200:
-            data = response.json()
-            content = data["choices"][0]["message"]["content"]
-            
-            # Clean JSON markers if present
-            if content.startswith('```json'):
-                content = content.replace('```json\n', '').replace('\n```', '').replace('```', '')
-            
-            return json.loads(content)
+            parsed = self._parse_chat_data(_json_loads(response.content))
+            self._cache_put(payload, parsed)
+            return parsed
         else:
             raise RuntimeError(f"API Error: {response.status_code}, {response.text}")
+
+    def classify_batch(self, rows):
+        """
+        Classify several service calls in a single API request
+
+        The system prompt (with the full rules block) is sent once for the
+        whole batch instead of once per row, so both token cost and HTTPS
+        round trips are amortized across the batch.
+
+        Args:
+            rows: List of (reason, notes, performed, issue) text tuples
+
+        Returns:
+            List of classification dictionaries, same order and length as rows
+        """
+        payload = self._build_batch_payload(rows)
+        results = self._post_and_parse(self.api_config['endpoint'], payload)
+        return self._validate_batch_results(results, len(rows))
+
+    def _build_batch_payload(self, rows):
+        """Build a chat completion payload covering a batch of row tuples"""
+        calls = []
+        for i, (reason, notes, performed, issue) in enumerate(rows, 1):
+            calls.append({
+                "call_number": i,
+                "reason_for_service": reason,
+                "special_notes": notes,
+                "service_performed": performed,
+                "issue_reported": issue
+            })
+
+        user_message = (
+            f"Classify each of the following {len(calls)} service calls independently. "
+            f"Respond with a JSON object {{\"results\": [...]}} where \"results\" is an "
+            f"array of exactly {len(calls)} elements and element i is the classification "
+            "result for call_number i, in the same format as for a single service call.\n"
+            + _json_dumps(calls, default=str).decode('utf-8')
+        )
+
+        return self._build_payload(user_message)
+
+    @staticmethod
+    def _validate_batch_results(results, expected):
+        """Ensure a batch response is a list of the expected length"""
+        # JSON mode forces an object at the top level, so batch results
+        # arrive wrapped as {"results": [...]}
+        if isinstance(results, dict):
+            results = results.get("results")
+        if not isinstance(results, list) or len(results) != expected:
+            raise RuntimeError(
+                f"Batch response mismatch: expected {expected} results, "
+                f"got {len(results) if isinstance(results, list) else type(results).__name__}"
+            )
+        return results
     
     def process_single_call(self, row_index, row_data, max_attempts=3):
         """
@@ -115,21 +334,16 @@ class ServiceCallClassifier:
         
         Args:
             row_index: Index of the row
-            row_data: Dictionary with service call data
+            row_data: Tuple (reason, notes, performed, issue) of call texts
             max_attempts: Maximum retry attempts
-        
+
         Returns:
             Tuple (row_index, result_dict)
         """
         attempts = 0
         while attempts < max_attempts:
             try:
-                result = self.classify_service_call(
-                    row_data['REASON_FOR_SERVICE'],
-                    row_data['SPECIAL_NOTES'],
-                    row_data['SERVICE_PERFORMED'],
-                    row_data['ISSUE_REPORTED']
-                )
+                result = self.classify_service_call(*row_data)
                 return row_index, result
             
             except Exception as e:
@@ -143,159 +357,412 @@ class ServiceCallClassifier:
                     }
         
         return row_index, None
-    
-    def process_dataframe(self, df, max_workers=10):
+
+    def process_batch_calls(self, row_indices, rows, max_attempts=3):
         """
-        Process entire DataFrame with multi-threading
-        
+        Process a batch of service calls with retry and per-row fallback
+
         Args:
-            df: DataFrame to process
-            max_workers: Number of concurrent threads
-        
+            row_indices: List of row indices for the batch
+            rows: List of (reason, notes, performed, issue) text tuples
+            max_attempts: Maximum retry attempts for the batched request
+
         Returns:
-            DataFrame with classification results
+            List of (row_index, result_dict) tuples
         """
-        print(f"\n{'='*80}")
-        print(f"CLASSIFICATION - Processing {len(df):,} service calls")
-        print(f"{'='*80}")
-        print(f"Workers: {max_workers}")
-        
-        # Prepare data
+        attempts = 0
+        while attempts < max_attempts:
+            try:
+                batch_results = self.classify_batch(rows)
+                return list(zip(row_indices, batch_results))
+            except Exception as e:
+                attempts += 1
+                if attempts == max_attempts:
+                    print(f"\n⚠ Batch of {len(rows)} failed after {max_attempts} attempts: {e}")
+                    print("  Falling back to per-row classification for this batch")
+
+        # Fallback: classify the rows of this batch individually
+        return [
+            self.process_single_call(idx, row, max_attempts)
+            for idx, row in zip(row_indices, rows)
+        ]
+
+    async def _process_batch_calls_async(self, client, row_indices, rows, max_attempts=3):
+        """
+        Async counterpart of process_batch_calls using a shared httpx client
+
+        Args:
+            client: httpx.AsyncClient to issue requests on
+            row_indices: List of row indices for the batch
+            rows: List of (reason, notes, performed, issue) text tuples
+            max_attempts: Maximum retry attempts for the batched request
+
+        Returns:
+            List of (row_index, result_dict) tuples
+        """
+        url = self.api_config['endpoint']
+        payload = self._build_batch_payload(rows)
+
+        cached = self._cache_get(payload)
+        if cached is not None:
+            return list(zip(row_indices, self._validate_batch_results(cached, len(rows))))
+
+        for attempt in range(max_attempts):
+            try:
+                response = await client.post(url, content=_json_dumps(payload))
+                if response.status_code != 200:
+                    raise RuntimeError(f"API Error: {response.status_code}, {response.text}")
+                results = self._validate_batch_results(
+                    self._parse_chat_data(_json_loads(response.content)), len(rows)
+                )
+                self._cache_put(payload, results)
+                return list(zip(row_indices, results))
+            except Exception as e:
+                if attempt == max_attempts - 1:
+                    print(f"\n⚠ Batch of {len(rows)} failed after {max_attempts} attempts: {e}")
+                    print("  Falling back to per-row classification for this batch")
+                else:
+                    await asyncio.sleep(min(2 ** attempt, 8))
+
+        # Fallback: classify the rows of this batch individually. Runs in a
+        # worker thread so the event loop keeps serving the other batches.
+        return [
+            await asyncio.to_thread(self.process_single_call, idx, row, max_attempts)
+            for idx, row in zip(row_indices, rows)
+        ]
+
+    async def _run_batches_async(self, batches, max_workers, total):
+        """Fan out all batches on one event loop, bounded by a semaphore"""
         results = {}
-        
+        semaphore = asyncio.Semaphore(max_workers)
+        limits = httpx.Limits(
+            max_connections=max_workers * 2,
+            max_keepalive_connections=max_workers * 2
+        )
+
+        async with httpx.AsyncClient(headers=dict(self.session.headers),
+                                     limits=limits, timeout=120) as client:
+            async def run_one(batch_indices, batch_rows):
+                async with semaphore:
+                    return await self._process_batch_calls_async(client, batch_indices, batch_rows)
+
+            tasks = [
+                asyncio.ensure_future(run_one(batch_indices, batch_rows))
+                for batch_indices, batch_rows in batches
+            ]
+
+            with tqdm(total=total, desc="  Classifying", ncols=100) as pbar:
+                for task in asyncio.as_completed(tasks):
+                    try:
+                        pairs = await task
+                        for row_idx, result in pairs:
+                            results[row_idx] = result
+                        pbar.update(len(pairs))
+                    except Exception as e:
+                        print(f"\n⚠ Task error: {e}")
+
+        return results
+
+    def _run_batches_threaded(self, batches, max_workers, total):
+        """Fan out all batches on a thread pool using the requests session"""
+        results = {}
+
         with ThreadPoolExecutor(max_workers=max_workers) as executor:
-            # Submit all tasks
+            # Submit one task per batch of rows
             futures = {}
-            for idx in df.index:
-                row_data = {
-                    'REASON_FOR_SERVICE': df.loc[idx, 'REASON_FOR_SERVICE'],
-                    'SPECIAL_NOTES': df.loc[idx, 'SPECIAL_NOTES'],
-                    'SERVICE_PERFORMED': df.loc[idx, 'SERVICE_PERFORMED'],
-                    'ISSUE_REPORTED': df.loc[idx, 'ISSUE_REPORTED']
-                }
-                future = executor.submit(self.process_single_call, idx, row_data)
-                futures[future] = idx
-            
+            for batch_indices, batch_rows in batches:
+                future = executor.submit(self.process_batch_calls, batch_indices, batch_rows)
+                futures[future] = batch_indices
+
             # Process completed tasks with progress bar
-            with tqdm(total=len(futures), desc="  Classifying", ncols=100) as pbar:
+            with tqdm(total=total, desc="  Classifying", ncols=100) as pbar:
                 for future in as_completed(futures):
                     try:
-                        row_idx, result = future.result()
-                        results[row_idx] = result
+                        for row_idx, result in future.result():
+                            results[row_idx] = result
                     except Exception as e:
                         print(f"\n⚠ Thread error: {e}")
-                    pbar.update(1)
-        
+                    pbar.update(len(futures[future]))
+
+        return results
+
+    def process_dataframe(self, df, max_workers=10, batch_size=8):
+        """
+        Process entire DataFrame with concurrent API fan-out
+
+        Service calls are grouped into batches of batch_size rows per API
+        request so the shared system prompt and the HTTPS round trip are
+        paid once per batch rather than once per row. The work is pure
+        network wait, so when httpx is installed (and no PAC proxy is in
+        use, which only requests supports) the batches run on a single
+        asyncio event loop; otherwise a thread pool is used.
+
+        Args:
+            df: DataFrame to process
+            max_workers: Maximum concurrent in-flight requests
+            batch_size: Number of service calls per API request
+
+        Returns:
+            DataFrame with classification results
+        """
+        use_async = httpx is not None and not self._uses_pac
+
+        print(f"\n{'='*80}")
+        print(f"CLASSIFICATION - Processing {len(df):,} service calls")
+        print(f"{'='*80}")
+        print(f"Workers: {max_workers}, batch size: {batch_size}, "
+              f"engine: {'asyncio/httpx' if use_async else 'threads/requests'}")
+
+        input_columns = [
+            'REASON_FOR_SERVICE', 'SPECIAL_NOTES',
+            'SERVICE_PERFORMED', 'ISSUE_REPORTED'
+        ]
+
+        # Rows with no text at all can only ever produce the unknown/low
+        # fallback, so answer them locally instead of paying an API call.
+        empty_mask = (
+            df[input_columns].fillna('').astype(str)
+            .apply(lambda s: s.str.strip()).eq('').all(axis=1)
+        )
+
+        results = {}
+        for idx in df.index[empty_mask]:
+            results[idx] = {
+                "analysis": {"total_problems_found": 0, "confidence_level": "low"},
+                "problems": []
+            }
+
+        if results:
+            print(f"Skipping {len(results):,} rows with no input text")
+
+        work_df = df.loc[~empty_mask]
+
+        # Extract all row data into one object ndarray instead of building a
+        # dict per row; tuple access from the array is C-level.
+        arr = work_df[input_columns].to_numpy(dtype=object, copy=False)
+        idxs = work_df.index.to_numpy()
+        n_rows = len(arr)
+
+        # Classify each distinct text combination once and fan the result
+        # back out; service-call data repeats the same phrases heavily.
+        keys = (
+            work_df['REASON_FOR_SERVICE'].fillna('').astype(str) + '\x01'
+            + work_df['SPECIAL_NOTES'].fillna('').astype(str) + '\x01'
+            + work_df['SERVICE_PERFORMED'].fillna('').astype(str) + '\x01'
+            + work_df['ISSUE_REPORTED'].fillna('').astype(str)
+        ).to_numpy()
+        unique_keys, first_pos, inverse = np.unique(
+            keys, return_index=True, return_inverse=True
+        )
+        n_unique = len(unique_keys)
+
+        if n_unique < n_rows:
+            print(f"Deduplicated {n_rows:,} rows into {n_unique:,} unique text combinations")
+
+        batches = []
+        for start in range(0, n_unique, batch_size):
+            stop = start + batch_size
+            batches.append((
+                list(range(start, stop if stop < n_unique else n_unique)),
+                [tuple(arr[p]) for p in first_pos[start:stop]]
+            ))
+
+        if use_async:
+            unique_results = asyncio.run(self._run_batches_async(batches, max_workers, n_unique))
+        else:
+            unique_results = self._run_batches_threaded(batches, max_workers, n_unique)
+
+        # Scatter unique results back to every originating row
+        for i in range(n_rows):
+            results[idxs[i]] = unique_results.get(inverse[i])
+
         # Add results to DataFrame
         df_result = self._add_results_to_dataframe(df, results)
         
         print(f"\n✓ Classification complete!")
         return df_result
     
-    def _add_results_to_dataframe(self, df, results):
+    def _add_results_to_dataframe(self, df, results, inplace=True):
         """
         Add classification results to DataFrame using all 4 approaches
-        
+
         Args:
-            df: Original DataFrame
+            df: Original DataFrame. Mutated when inplace=True (the
+                default): the result columns are attached directly so the
+                largest frame in the pipeline is never duplicated.
             results: Dictionary of results keyed by row index
-        
+            inplace: When False, work on a copy and leave df untouched
+
         Returns:
             DataFrame with added columns
         """
-        df_result = df.copy()
-        approach4_records = []
-        
-        # Initialize new columns
-        df_result['Total_Problems'] = 0
-        df_result['Overall_Confidence'] = ''
-        df_result['Part_Assembly_Concat'] = ''
-        df_result['Failure_Mode_Concat'] = ''
-        df_result['Fix_Concat'] = ''
-        df_result['Confidence_Concat'] = ''
-        df_result['Primary_Part'] = ''
-        df_result['Primary_Failure'] = ''
-        df_result['Primary_Fix'] = ''
-        df_result['Primary_Confidence'] = ''
-        df_result['All_Problems_JSON'] = ''
-        
-        # Add individual problem columns (max 3 problems)
+        # Normalized (approach 4) output as parallel column lists; building
+        # a dict per record only for pd.DataFrame to tear it apart again
+        # costs both time and peak memory.
+        norm_service_order = []
+        norm_row_index = []
+        norm_problem_num = []
+        norm_part = []
+        norm_failure_mode = []
+        norm_fix = []
+        norm_confidence = []
+        norm_supporting = []
+
+        # Build plain Python column buffers in one pass, then assign them to
+        # the DataFrame in bulk. Per-cell .at[] writes go through the pandas
+        # label indexer ~15 times per row, which dominates post-processing
+        # time for large files.
         MAX_PROBLEMS = 3
+        n_rows = len(df)
+
+        columns = {
+            'Total_Problems': [0] * n_rows,
+            'Overall_Confidence': [''] * n_rows,
+            'Part_Assembly_Concat': [''] * n_rows,
+            'Failure_Mode_Concat': [''] * n_rows,
+            'Fix_Concat': [''] * n_rows,
+            'Confidence_Concat': [''] * n_rows,
+            'Primary_Part': [''] * n_rows,
+            'Primary_Failure': [''] * n_rows,
+            'Primary_Fix': [''] * n_rows,
+            'Primary_Confidence': [''] * n_rows,
+            'All_Problems_JSON': [''] * n_rows,
+        }
+
+        # Individual problem columns (max 3 problems)
         for i in range(1, MAX_PROBLEMS + 1):
-            df_result[f'Part_{i}'] = ''
-            df_result[f'Failure_Mode_{i}'] = ''
-            df_result[f'Fix_{i}'] = ''
-            df_result[f'Confidence_{i}'] = ''
-        
-        # Process each result
-        for idx, result in results.items():
+            columns[f'Part_{i}'] = [''] * n_rows
+            columns[f'Failure_Mode_{i}'] = [''] * n_rows
+            columns[f'Fix_{i}'] = [''] * n_rows
+            columns[f'Confidence_{i}'] = [''] * n_rows
+
+        # Bind the hot column buffers to locals; the row loop below is
+        # specialized for MAX_PROBLEMS=3 with direct key access, so no
+        # f-string column lookups or dict .get dispatch remain per row.
+        total_col = columns['Total_Problems']
+        overall_conf_col = columns['Overall_Confidence']
+        part_concat_col = columns['Part_Assembly_Concat']
+        fm_concat_col = columns['Failure_Mode_Concat']
+        fix_concat_col = columns['Fix_Concat']
+        conf_concat_col = columns['Confidence_Concat']
+        primary_part_col = columns['Primary_Part']
+        primary_fm_col = columns['Primary_Failure']
+        primary_fix_col = columns['Primary_Fix']
+        primary_conf_col = columns['Primary_Confidence']
+        json_col = columns['All_Problems_JSON']
+        part_cols = (columns['Part_1'], columns['Part_2'], columns['Part_3'])
+        fm_cols = (columns['Failure_Mode_1'], columns['Failure_Mode_2'], columns['Failure_Mode_3'])
+        fix_cols = (columns['Fix_1'], columns['Fix_2'], columns['Fix_3'])
+        conf_cols = (columns['Confidence_1'], columns['Confidence_2'], columns['Confidence_3'])
+
+        problem_keys = ("part", "failure_mode", "fix", "confidence", "supporting_text")
+
+        # Pull the id column out once; a df.loc label lookup per row would
+        # re-hash 'SERVICE_ORDER' for every result.
+        service_orders = df['SERVICE_ORDER'].to_dict()
+
+        # Process each result by position
+        for pos, idx in enumerate(df.index):
+            result = results.get(idx)
             if result is None:
                 continue
-            
+
             problems = result.get("problems", [])
-            total_problems = result.get("analysis", {}).get("total_problems_found", 0)
-            confidence_level = result.get("analysis", {}).get("confidence_level", "low")
-            service_order = df.loc[idx, "SERVICE_ORDER"]
-            
+            analysis = result.get("analysis", {})
+            service_order = service_orders[idx]
+
+            # Normalize once so the rest of the loop can index directly
+            for problem in problems:
+                for key in problem_keys:
+                    if key not in problem:
+                        problem[key] = ""
+
             # Store basic info
-            df_result.at[idx, 'Total_Problems'] = total_problems
-            df_result.at[idx, 'Overall_Confidence'] = confidence_level
-            
+            total_col[pos] = analysis.get("total_problems_found", 0)
+            overall_conf_col[pos] = analysis.get("confidence_level", "low")
+
             # Approach 1: Concatenated
             if problems:
-                parts = " | ".join([p.get("part", "") for p in problems])
-                failures = " | ".join([p.get("failure_mode", "") for p in problems])
-                fixes = " | ".join([p.get("fix", "") for p in problems])
-                confidences = " | ".join([p.get("confidence", "") for p in problems])
-                
-                df_result.at[idx, 'Part_Assembly_Concat'] = parts
-                df_result.at[idx, 'Failure_Mode_Concat'] = failures
-                df_result.at[idx, 'Fix_Concat'] = fixes
-                df_result.at[idx, 'Confidence_Concat'] = confidences
-                
+                part_concat_col[pos] = " | ".join([p["part"] for p in problems])
+                fm_concat_col[pos] = " | ".join([p["failure_mode"] for p in problems])
+                fix_concat_col[pos] = " | ".join([p["fix"] for p in problems])
+                conf_concat_col[pos] = " | ".join([p["confidence"] for p in problems])
+
                 # Primary problem
-                df_result.at[idx, 'Primary_Part'] = problems[0].get("part", "")
-                df_result.at[idx, 'Primary_Failure'] = problems[0].get("failure_mode", "")
-                df_result.at[idx, 'Primary_Fix'] = problems[0].get("fix", "")
-                df_result.at[idx, 'Primary_Confidence'] = problems[0].get("confidence", "")
-            
-            # Approach 2: Separate columns
-            for i, problem in enumerate(problems[:MAX_PROBLEMS]):
-                df_result.at[idx, f'Part_{i+1}'] = problem.get("part", "")
-                df_result.at[idx, f'Failure_Mode_{i+1}'] = problem.get("failure_mode", "")
-                df_result.at[idx, f'Fix_{i+1}'] = problem.get("fix", "")
-                df_result.at[idx, f'Confidence_{i+1}'] = problem.get("confidence", "")
-            
+                p0 = problems[0]
+                primary_part_col[pos] = p0["part"]
+                primary_fm_col[pos] = p0["failure_mode"]
+                primary_fix_col[pos] = p0["fix"]
+                primary_conf_col[pos] = p0["confidence"]
+
+            # Approach 2: Separate columns, unrolled for the 3-problem cap
+            for i in range(min(len(problems), MAX_PROBLEMS)):
+                problem = problems[i]
+                part_cols[i][pos] = problem["part"]
+                fm_cols[i][pos] = problem["failure_mode"]
+                fix_cols[i][pos] = problem["fix"]
+                conf_cols[i][pos] = problem["confidence"]
+
             # Approach 3: JSON
-            df_result.at[idx, 'All_Problems_JSON'] = json.dumps(problems)
-            
+            json_col[pos] = _json_dumps(problems).decode('utf-8')
+
             # Approach 4: Normalized records
             for problem_num, problem in enumerate(problems, 1):
-                approach4_records.append({
-                    "SERVICE_ORDER": service_order,
-                    "Row_Index": idx,
-                    "Problem_Number": problem_num,
-                    "Part": problem.get("part", ""),
-                    "Failure_Mode": problem.get("failure_mode", ""),
-                    "Fix": problem.get("fix", ""),
-                    "Confidence": problem.get("confidence", ""),
-                    "Supporting_Text": problem.get("supporting_text", "")
-                })
-            
+                norm_service_order.append(service_order)
+                norm_row_index.append(idx)
+                norm_problem_num.append(problem_num)
+                norm_part.append(problem["part"])
+                norm_failure_mode.append(problem["failure_mode"])
+                norm_fix.append(problem["fix"])
+                norm_confidence.append(problem["confidence"])
+                norm_supporting.append(problem["supporting_text"])
+
             # If no problems, add unknown record
             if not problems:
-                approach4_records.append({
-                    "SERVICE_ORDER": service_order,
-                    "Row_Index": idx,
-                    "Problem_Number": 1,
-                    "Part": "Unknown",
-                    "Failure_Mode": "Unknown",
-                    "Fix": "Unknown",
-                    "Confidence": "low",
-                    "Supporting_Text": ""
-                })
-        
-        # Create normalized dataframe
-        problems_df = pd.DataFrame(approach4_records)
-        
+                norm_service_order.append(service_order)
+                norm_row_index.append(idx)
+                norm_problem_num.append(1)
+                norm_part.append("Unknown")
+                norm_failure_mode.append("Unknown")
+                norm_fix.append("Unknown")
+                norm_confidence.append("low")
+                norm_supporting.append("")
+
+        # The taxonomy columns draw from the closed part_failure_data
+        # vocabulary, so store them as categoricals instead of object
+        # columns full of repeated strings. Off-taxonomy model output is
+        # kept by extending the category list rather than dropped as NaN.
+        taxonomy_columns = {'Primary_Part': self._part_categories,
+                            'Primary_Failure': self._failure_categories,
+                            'Primary_Fix': self._fix_categories}
+        for i in range(1, MAX_PROBLEMS + 1):
+            taxonomy_columns[f'Part_{i}'] = self._part_categories
+            taxonomy_columns[f'Failure_Mode_{i}'] = self._failure_categories
+            taxonomy_columns[f'Fix_{i}'] = self._fix_categories
+
+        for name, categories in taxonomy_columns.items():
+            extra = set(columns[name]).difference(categories)
+            if extra:
+                categories = categories + sorted(extra)
+            columns[name] = pd.Categorical(columns[name], categories=categories)
+
+        # Single bulk assignment instead of per-cell writes
+        df_result = df if inplace else df.copy()
+        result_frame = pd.DataFrame(columns, index=df.index)
+        df_result[list(columns.keys())] = result_frame
+
+        # Create normalized dataframe from the column lists; the taxonomy
+        # columns come from a small closed vocabulary, so store them as
+        # categoricals rather than repeated strings.
+        problems_df = pd.DataFrame({
+            "SERVICE_ORDER": norm_service_order,
+            "Row_Index": norm_row_index,
+            "Problem_Number": norm_problem_num,
+            "Part": pd.Categorical(norm_part),
+            "Failure_Mode": pd.Categorical(norm_failure_mode),
+            "Fix": pd.Categorical(norm_fix),
+            "Confidence": pd.Categorical(norm_confidence),
+            "Supporting_Text": norm_supporting
+        }, copy=False)
+
         return df_result, problems_df
@@ -2,10 +2,11 @@
 Main pipeline orchestrator for service call processing
 """
 import time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 from src.utils import (
-    load_json, load_excel, save_excel, 
-    find_new_service_orders, merge_processed_data,
+    load_json, load_excel, save_excel,
+    align_id_dtypes, find_new_service_orders, merge_processed_data,
     validate_dataframe, print_summary
 )
 from src.translator import ServiceCallTranslator, show_translation_sample
@@ -70,7 +71,8 @@ class ServiceCallPipeline:
             self.part_failure_data,
             self.prompts,
             self.settings['api'],
-            self.token
+            self.token,
+            cache_dir=self.settings['classification'].get('cache_dir')
         )
         print("  ✓ Classifier initialized")
     
@@ -131,7 +133,8 @@ class ServiceCallPipeline:
         
         df_classified, problems_df = self.classifier.process_dataframe(
             df_translated,
-            max_workers=self.settings['classification']['max_workers']
+            max_workers=self.settings['classification']['max_workers'],
+            batch_size=self.settings['classification'].get('batch_size', 8)
         )
         
         # Save results
@@ -184,16 +187,22 @@ class ServiceCallPipeline:
         print("INCREMENTAL PROCESSING MODE")
         print(f"{'='*80}")
         
-        # Load files
+        # Load both input files concurrently; each openpyxl parse is slow
+        # and single-threaded, and the two files are independent.
         print(f"\n📂 Loading files...")
-        new_df = load_excel(new_file)
-        processed_df = load_excel(processed_file)
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            new_future = executor.submit(load_excel, new_file)
+            processed_future = executor.submit(load_excel, processed_file)
+            new_df = new_future.result()
+            processed_df = processed_future.result()
         
         if new_df is None:
             print("✗ Failed to load new file!")
             return None, None
         
-        # Find new SERVICE_ORDERs
+        # Find new SERVICE_ORDERs, with ids cast to a common fast dtype
+        # so the comparison is a native hash-based anti-join
+        new_df, processed_df = align_id_dtypes(new_df, processed_df)
         records_to_process = find_new_service_orders(new_df, processed_df)
         
         if records_to_process.empty:
@@ -216,7 +225,8 @@ class ServiceCallPipeline:
         
         new_classified, new_problems_df = self.classifier.process_dataframe(
             new_translated,
-            max_workers=self.settings['classification']['max_workers']
+            max_workers=self.settings['classification']['max_workers'],
+            batch_size=self.settings['classification'].get('batch_size', 8)
         )
         
         # Merge with existing processed data
@@ -241,18 +251,23 @@ class ServiceCallPipeline:
         print(f"{'='*80}")
         
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        
-        main_file = save_excel(
-            combined_df,
-            f"{output_base_name}_{timestamp}.xlsx",
-            create_backup=False  # Don't backup incremental files
-        )
-        
-        problems_file = save_excel(
-            combined_problems_df,
-            f"{output_base_name}_problems_{timestamp}.xlsx",
-            create_backup=False
-        )
+
+        # The two output files are independent, so serialize them in parallel
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            main_future = executor.submit(
+                save_excel,
+                combined_df,
+                f"{output_base_name}_{timestamp}.xlsx",
+                create_backup=False  # Don't backup incremental files
+            )
+            problems_future = executor.submit(
+                save_excel,
+                combined_problems_df,
+                f"{output_base_name}_problems_{timestamp}.xlsx",
+                create_backup=False
+            )
+            main_file = main_future.result()
+            problems_file = problems_future.result()
         
         # Summary
         elapsed = time.time() - start_time
@@ -2,93 +2,297 @@
 Translation module for service call data
 """
 import asyncio
+import hashlib
+import os
+import sqlite3
+import time
+import numpy as np
 import pandas as pd
 from googletrans import Translator
 from tqdm import tqdm
 
+from src.utils import load_json, save_json
+
+# httpx is only needed for the batch-capable DeepL backend
+try:
+    import httpx
+except ImportError:
+    httpx = None
+
+# pyarrow is optional: Arrow-backed string columns strip and hash-unique
+# at C speed, where object-dtype unique hashes Python strings one by one
+try:
+    import pyarrow as pa
+    import pyarrow.compute as pc
+except ImportError:
+    pa = None
+    pc = None
+
+
+class DeepLBackend:
+    """
+    Batch-capable translation backend using the DeepL REST API
+
+    DeepL accepts up to 50 texts per request, so one HTTP round trip
+    covers a whole batch instead of one call per string.
+    """
+
+    max_batch = 50
+
+    def __init__(self, api_key, target_language,
+                 api_url='https://api-free.deepl.com/v2/translate'):
+        if httpx is None:
+            raise RuntimeError("httpx is required for the DeepL backend")
+        self.api_key = api_key
+        self.target_language = target_language
+        self.api_url = api_url
+        self._client = None
+
+    async def __aenter__(self):
+        self._client = httpx.AsyncClient(timeout=60)
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self._client.aclose()
+        self._client = None
+
+    async def translate_many(self, texts):
+        """Translate a list of texts in one request, preserving order"""
+        response = await self._client.post(
+            self.api_url,
+            data={'text': texts, 'target_lang': self.target_language.upper()},
+            headers={'Authorization': f'DeepL-Auth-Key {self.api_key}'}
+        )
+        if response.status_code != 200:
+            raise RuntimeError(f"DeepL API Error: {response.status_code}, {response.text}")
+        return [item['text'] for item in response.json()['translations']]
+
+
+def _looks_english(text):
+    """
+    Cheap already-in-target heuristic for English targets
+
+    Pure-ASCII strings in service-call data are overwhelmingly English
+    text, product codes or part numbers, while the source languages that
+    actually need translating use non-ASCII characters. Good enough to
+    skip the network call; wrong guesses just pass the original through.
+    """
+    return text.isascii()
+
+
+class _RateLimiter:
+    """Minimal async token-bucket limiter for outbound requests"""
+
+    def __init__(self, rate_per_second):
+        self.rate = rate_per_second
+        self._allowance = rate_per_second
+        self._last = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self):
+        async with self._lock:
+            now = time.monotonic()
+            self._allowance = min(self.rate, self._allowance + (now - self._last) * self.rate)
+            self._last = now
+            if self._allowance < 1:
+                await asyncio.sleep((1 - self._allowance) / self.rate)
+                self._allowance = 0
+            else:
+                self._allowance -= 1
+
+
+class TranslationCache:
+    """SQLite-backed persistent cache of translated strings"""
+
+    def __init__(self, path):
+        """
+        Open (or create) the cache database
+
+        Args:
+            path: Path to the SQLite database file
+        """
+        parent = os.path.dirname(path)
+        if parent:
+            os.makedirs(parent, exist_ok=True)
+        self._conn = sqlite3.connect(path)
+        self._conn.execute(
+            'CREATE TABLE IF NOT EXISTS translations ('
+            ' lang TEXT NOT NULL,'
+            ' src_hash BLOB NOT NULL,'
+            ' src TEXT,'
+            ' dst TEXT,'
+            ' PRIMARY KEY (lang, src_hash))'
+        )
+        self._conn.commit()
+
+    @staticmethod
+    def _hash(text):
+        return hashlib.blake2b(text.encode('utf-8'), digest_size=16).digest()
+
+    def get(self, lang, text):
+        """Return the cached translation for text, or None"""
+        row = self._conn.execute(
+            'SELECT dst FROM translations WHERE lang = ? AND src_hash = ?',
+            (lang, self._hash(text))
+        ).fetchone()
+        return row[0] if row else None
+
+    def put_many(self, lang, pairs):
+        """Store (source, translation) pairs in a single transaction"""
+        self._conn.executemany(
+            'INSERT OR IGNORE INTO translations (lang, src_hash, src, dst)'
+            ' VALUES (?, ?, ?, ?)',
+            [(lang, self._hash(src), src, dst) for src, dst in pairs]
+        )
+        self._conn.commit()
+
+    def close(self):
+        self._conn.close()
+
 
 class ServiceCallTranslator:
     """Handles translation of service call data"""
-    
+
     def __init__(self, config):
         """
         Initialize translator
-        
+
         Args:
             config: Dictionary with translation settings
         """
-        self.batch_size = config.get('batch_size', 10)
-        self.batch_delay = config.get('batch_delay', 0.5)
+        self.max_concurrent = config.get('max_concurrent', 20)
+        self.rate_per_second = config.get('rate_per_second', 0)
         self.target_language = config.get('target_language', 'en')
         self.columns_to_translate = config.get('columns_to_translate', [])
-    
+
+        # Translation backend: 'deepl' sends up to 50 texts per request;
+        # 'googletrans' (default) is the keyless one-string-per-call path
+        self.backend_name = config.get('backend', 'googletrans')
+        self.deepl_api_key = config.get('deepl_api_key')
+        self.deepl_api_url = config.get('deepl_api_url', 'https://api-free.deepl.com/v2/translate')
+
+        # Optional persistent cache: strings seen in earlier runs (or in
+        # other columns) skip the translation API entirely
+        cache_path = config.get('cache_path')
+        self.cache = TranslationCache(cache_path) if cache_path else None
+
+        # Shared client, backend and rate limiter for the duration of a
+        # translate run; opening a fresh client per string would redo the
+        # TLS handshake every time
+        self._translator = None
+        self._backend = None
+        self._limiter = None
+
     async def translate_text(self, text: str) -> str:
-        """Translate a single text string"""
-        async with Translator() as translator:
-            result = await translator.translate(text, dest=self.target_language)
-            return result.text
+        """Translate a single text string using the shared client"""
+        result = await self._translator.translate(text, dest=self.target_language)
+        return result.text
     
-    async def translate_unique_values(self, unique_values, column_name):
+    async def translate_unique_values(self, unique_values, column_name, known=None):
         """
-        Translate unique values with batching and progress tracking
-        
+        Translate unique values with bounded concurrency
+
+        All pending strings are in flight at once, capped by a semaphore
+        (and the optional rate limiter), so the pipe stays full instead of
+        stalling on the slowest item of each batch.
+
         Args:
-            unique_values: Array of unique values to translate
+            unique_values: Array of unique non-empty strings to translate,
+                already cleaned by the caller (no NaN, stripped)
             column_name: Name of column being translated (for progress display)
-        
+            known: Optional dict of already-translated strings (e.g. from a
+                recovered checkpoint) to reuse without an API call
+
         Returns:
             Dictionary mapping original text to translated text
         """
         translation_map = {}
         total = len(unique_values)
-        
-        print(f"\n🔄 Translating {total:,} unique values for {column_name}...")
-        
+        cache_hits = 0
+        already_english = 0
+        pending = []
+        check_english = self.target_language == 'en'
+
+        # Resolve already-English strings and cache hits up front
+        for text in unique_values:
+            if known and text in known:
+                translation_map[text] = known[text]
+                cache_hits += 1
+                continue
+
+            if check_english and _looks_english(text):
+                translation_map[text] = text
+                already_english += 1
+                continue
+
+            if self.cache is not None:
+                cached = self.cache.get(self.target_language, text)
+                if cached is not None:
+                    translation_map[text] = cached
+                    cache_hits += 1
+                    continue
+
+            pending.append(text)
+
+        print(f"\n🔄 Translating {len(pending):,} of {total:,} unique values for {column_name}...")
+        if already_english:
+            print(f"  ⏭ Skipped {already_english:,} values already in English")
+
+        semaphore = asyncio.Semaphore(self.max_concurrent)
+
+        async def bounded_translate(texts):
+            async with semaphore:
+                if self._limiter is not None:
+                    await self._limiter.acquire()
+                try:
+                    if self._backend is not None:
+                        return texts, await self._backend.translate_many(texts)
+                    return texts, [await self.translate_text(texts[0])]
+                except Exception as e:
+                    return texts, e
+
+        # Batch-capable backends take many texts per request; googletrans
+        # takes one
+        group_size = self._backend.max_batch if self._backend is not None else 1
+        groups = [pending[i:i + group_size] for i in range(0, len(pending), group_size)]
+
+        new_pairs = []
+        error_count = 0
+        errors = []
+
         with tqdm(total=total, desc=f"  {column_name}", ncols=100) as pbar:
-            for i in range(0, total, self.batch_size):
-                batch = unique_values[i:i + self.batch_size]
-                
-                # Prepare translation tasks
-                tasks = []
-                valid_texts = []
-                
-                for text in batch:
-                    if pd.isna(text) or str(text).strip() == '':
-                        translation_map[text] = ''
-                    else:
-                        tasks.append(self.translate_text(str(text)))
-                        valid_texts.append(text)
-                
-                # Execute batch concurrently
-                if tasks:
-                    try:
-                        results = await asyncio.gather(*tasks, return_exceptions=True)
-                        
-                        # Map results back to original texts
-                        for idx, text in enumerate(valid_texts):
-                            result = results[idx]
-                            if isinstance(result, Exception):
-                                print(f"\n  ⚠ Error: {str(text)[:50]}... - {result}")
-                                translation_map[text] = str(text)  # Keep original on error
-                            else:
-                                translation_map[text] = result
-                    
-                    except Exception as e:
-                        print(f"\n  ⚠ Batch error: {e}")
-                        # Fallback: translate one by one
-                        for text in valid_texts:
-                            try:
-                                translation_map[text] = await self.translate_text(str(text))
-                            except Exception as e2:
-                                print(f"  ⚠ Error: {str(text)[:30]}... - {e2}")
-                                translation_map[text] = str(text)
-                
-                pbar.update(len(batch))
-                
-                # Delay between batches
-                if i + self.batch_size < total:
-                    await asyncio.sleep(self.batch_delay)
-        
+            pbar.update(total - len(pending))
+
+            for task in asyncio.as_completed([bounded_translate(g) for g in groups]):
+                texts, result = await task
+                if isinstance(result, Exception):
+                    # Keep originals on error; log once at the end instead
+                    # of flushing stdout per failure
+                    error_count += len(texts)
+                    errors.append(result)
+                    translation_map.update({text: text for text in texts})
+                else:
+                    translation_map.update(zip(texts, result))
+                    new_pairs.extend(zip(texts, result))
+
+                    # Persist in batched transactions to keep fsyncs low
+                    if self.cache is not None and len(new_pairs) >= 100:
+                        self.cache.put_many(self.target_language, new_pairs)
+                        new_pairs = []
+
+                pbar.update(len(texts))
+
+        if self.cache is not None and new_pairs:
+            self.cache.put_many(self.target_language, new_pairs)
+
+        if error_count:
+            distinct = {f"{type(e).__name__}: {e}" for e in errors}
+            print(f"  ⚠ {error_count:,} strings failed to translate; originals kept")
+            for message in sorted(distinct)[:3]:
+                print(f"    {message}")
+        if cache_hits:
+            print(f"  💾 Cache hits: {cache_hits:,} of {total:,}")
+
         return translation_map
     
     async def translate_dataframe_async(self, df, output_path=None):
@@ -102,59 +306,128 @@ class ServiceCallTranslator:
         Returns:
             DataFrame with translated columns
         """
-        df_result = df.copy()
-        
         # Filter to only columns that exist
         columns_to_process = [
-            col for col in self.columns_to_translate 
+            col for col in self.columns_to_translate
             if col in df.columns
         ]
-        
+
         if not columns_to_process:
             print("\n⚠ No matching columns found for translation!")
-            return df_result
-        
+            return df
+
         print(f"\n{'='*80}")
         print(f"TRANSLATION - Processing {len(columns_to_process)} columns")
         print(f"{'='*80}")
-        
+
+        # Only new _EN columns get created, so copying the input up front
+        # just doubles peak memory; build the new columns in a slim frame
+        # and join once at the end.
+        new_columns = pd.DataFrame(index=df.index)
+
+        # One pooled client for the whole run: connections are set up once
+        # and kept alive across every string and column
+        self._limiter = _RateLimiter(self.rate_per_second) if self.rate_per_second else None
+        if self.backend_name == 'deepl' and self.deepl_api_key:
+            async with DeepLBackend(self.deepl_api_key, self.target_language,
+                                    self.deepl_api_url) as backend:
+                self._backend = backend
+                new_columns = await self._translate_columns(df, new_columns, columns_to_process, output_path)
+            self._backend = None
+        else:
+            async with Translator() as translator:
+                self._translator = translator
+                new_columns = await self._translate_columns(df, new_columns, columns_to_process, output_path)
+            self._translator = None
+        self._limiter = None
+
+        return pd.concat([df, new_columns], axis=1, copy=False)
+
+    async def _translate_columns(self, df, df_result, columns_to_process, output_path):
+        """Translate the pooled unique strings once, then map per column"""
+        # Clean each column vectorized (strip, drop NaN and empties) so the
+        # per-value Python checks disappear from the translation loop, and
+        # pool the unique values of every column so a string appearing in
+        # several columns is only translated a single time
+        string_dtype = 'string[pyarrow]' if pa is not None else 'string'
+        stripped_cols = {}
+        uniques = []
         for col in columns_to_process:
-            print(f"\n📝 Column: {col}")
-            
-            # Get unique non-null values
-            unique_values = df[col].dropna().unique()
-            total_unique = len(unique_values)
-            total_cells = df[col].notna().sum()
-            
-            if total_unique == 0:
-                print(f"  ℹ No data to translate")
-                continue
-            
-            print(f"  Unique values: {total_unique:,}")
-            print(f"  Total cells: {total_cells:,}")
-            print(f"  Efficiency: {total_cells / total_unique:.1f}x reduction")
-            
-            # Translate unique values
-            translation_map = await self.translate_unique_values(unique_values, col)
-            
-            # Apply translations to dataframe
+            stripped = df[col].astype(string_dtype).str.strip()
+            stripped_cols[col] = stripped
+            valid = stripped[stripped.notna() & stripped.ne('')]
+            uniques.append(valid.unique())
+
+        if len(uniques) == 1:
+            all_unique = uniques[0]
+        elif pa is not None:
+            pooled = pa.chunked_array([pa.array(u, type=pa.string()) for u in uniques])
+            all_unique = pc.unique(pooled).to_pylist()
+        else:
+            all_unique = pd.unique(np.concatenate(
+                [np.asarray(u, dtype=object) for u in uniques]
+            ))
+
+        total_unique = len(all_unique)
+        total_cells = int(df[columns_to_process].notna().sum().sum())
+
+        if total_unique == 0:
+            print(f"\nℹ No data to translate")
+            return df_result
+
+        print(f"\n  Unique values: {total_unique:,}")
+        print(f"  Total cells: {total_cells:,}")
+        print(f"  Efficiency: {total_cells / total_unique:.1f}x reduction")
+
+        # Recover the translation map checkpoint from a previous
+        # interrupted run, if any
+        progress_file = output_path.replace('.xlsx', '_translation_map.json') if output_path else None
+        known = None
+        if progress_file and os.path.exists(progress_file):
+            try:
+                known = load_json(progress_file)
+                print(f"  ♻ Recovered {len(known):,} translations from checkpoint")
+            except Exception as e:
+                print(f"  ⚠ Could not load checkpoint: {e}")
+
+        # Translate the pooled unique values
+        translation_map = await self.translate_unique_values(all_unique, 'ALL COLUMNS', known=known)
+
+        # Checkpoint just the translation map; rewriting the whole frame
+        # per run is O(rows x columns) of redundant serialization when only
+        # the map is needed to resume. The write runs in a worker thread so
+        # it overlaps with the column mapping below instead of blocking the
+        # event loop.
+        save_task = None
+        if progress_file:
+            save_task = asyncio.create_task(
+                asyncio.to_thread(save_json, translation_map, progress_file)
+            )
+
+        for col in columns_to_process:
+            # Apply translations to dataframe; the map keys are stripped
+            # strings, so map from the stripped column
             new_col_name = f'{col}_EN'
-            df_result[new_col_name] = df[col].map(translation_map)
-            
-            # Fill NaN values with original
-            df_result[new_col_name].fillna(df[col], inplace=True)
-            
-            print(f"  ✓ Completed! Created column: {new_col_name}")
-            
-            # Save progress if path provided
-            if output_path:
-                try:
-                    progress_file = output_path.replace('.xlsx', '_progress.xlsx')
-                    df_result.to_excel(progress_file, index=False)
-                    print(f"  💾 Progress saved")
-                except Exception as e:
-                    print(f"  ⚠ Could not save progress: {e}")
-        
+            mapped = stripped_cols[col].map(translation_map)
+
+            # Fill NaN values with the original column; where() is a single
+            # vectorized pass and stays copy-free under pandas 2.x
+            # Copy-on-Write, unlike inplace fillna
+            translated = mapped.where(mapped.notna(), df[col])
+
+            # Store as categorical: memory scales with unique strings
+            # plus an int code per row instead of a string object per cell
+            df_result[new_col_name] = pd.Categorical(translated)
+
+            print(f"  ✓ Created column: {new_col_name}")
+
+        if save_task is not None:
+            try:
+                await save_task
+                print(f"  💾 Progress saved")
+            except Exception as e:
+                print(f"  ⚠ Could not save progress: {e}")
+
         return df_result
     
     def translate(self, df, output_path=None):
@@ -6,6 +6,13 @@ import json
 import pandas as pd
 from datetime import datetime
 
+# xlsxwriter is optional: it writes workbooks noticeably faster than
+# pandas' default openpyxl engine.
+try:
+    import xlsxwriter
+except ImportError:
+    xlsxwriter = None
+
 
 def load_json(filepath):
     """Load JSON file"""
@@ -19,10 +26,89 @@ def save_json(data, filepath):
         json.dump(data, f, indent=2, ensure_ascii=False)
 
 
-def load_excel(filepath):
-    """Load Excel file with error handling"""
+def _iter_excel_chunks(workbook, chunksize, usecols=None, dtype=None):
+    """Stream an open read-only openpyxl workbook as DataFrame chunks"""
+    try:
+        rows = workbook.active.iter_rows(values_only=True)
+        header = list(next(rows))
+
+        keep = None
+        columns = header
+        if usecols:
+            wanted = set(usecols)
+            keep = [i for i, name in enumerate(header) if name in wanted]
+            columns = [header[i] for i in keep]
+
+        def build_chunk(buffer):
+            if keep is not None:
+                buffer = [[row[i] for i in keep] for row in buffer]
+            chunk = pd.DataFrame(buffer, columns=columns)
+            if dtype:
+                chunk = chunk.astype(dtype)
+            return chunk
+
+        buffer = []
+        for row in rows:
+            buffer.append(row)
+            if len(buffer) >= chunksize:
+                yield build_chunk(buffer)
+                buffer = []
+        if buffer:
+            yield build_chunk(buffer)
+    finally:
+        workbook.close()
+
+
+def load_excel(filepath, usecols=None, dtype=None, chunksize=None):
+    """
+    Load Excel file with error handling
+
+    Args:
+        filepath: Path to the Excel file
+        usecols: Optional list of column names to read; skipping unused
+            columns cuts both parse time and memory
+        dtype: Optional column-to-dtype mapping applied on load
+        chunksize: When set, return an iterator of DataFrames of up to
+            chunksize rows each, streamed through openpyxl read-only mode
+            instead of materializing the whole sheet
+
+    Returns:
+        DataFrame, an iterator of DataFrames (chunksize mode), or None on error
+    """
+    if filepath.endswith('.parquet'):
+        try:
+            df = pd.read_parquet(filepath, columns=usecols)
+            if dtype:
+                df = df.astype(dtype)
+            print(f"✓ Loaded {filepath}")
+            print(f"  Rows: {len(df):,}")
+            print(f"  Columns: {len(df.columns)}")
+            return df
+        except FileNotFoundError:
+            print(f"✗ Error: File '{filepath}' not found!")
+            return None
+        except Exception as e:
+            print(f"✗ Error loading file: {e}")
+            return None
+
+    if chunksize:
+        import openpyxl
+
+        # Open eagerly so failures surface here, not on first iteration
+        try:
+            workbook = openpyxl.load_workbook(filepath, read_only=True, data_only=True)
+        except FileNotFoundError:
+            print(f"✗ Error: File '{filepath}' not found!")
+            return None
+        except Exception as e:
+            print(f"✗ Error loading file: {e}")
+            return None
+
+        print(f"✓ Streaming {filepath} in chunks of {chunksize:,} rows")
+        return _iter_excel_chunks(workbook, chunksize, usecols=usecols, dtype=dtype)
+
     try:
-        df = pd.read_excel(filepath)
+        df = pd.read_excel(filepath, usecols=usecols, dtype=dtype)
         print(f"✓ Loaded {filepath}")
         print(f"  Rows: {len(df):,}")
         print(f"  Columns: {len(df.columns)}")
@@ -35,30 +121,82 @@ def load_excel(filepath):
         return None
 
 
+def write_excel(df, filepath):
+    """Write DataFrame to xlsx via xlsxwriter when available"""
+    if xlsxwriter is not None:
+        # No constant_memory here: to_excel writes cells column-major and
+        # constant_memory drops writes to already-flushed rows, keeping
+        # only the first column. Plain xlsxwriter still beats openpyxl.
+        with pd.ExcelWriter(filepath, engine='xlsxwriter') as writer:
+            df.to_excel(writer, index=False)
+    else:
+        df.to_excel(filepath, index=False)
+
+
+def write_parquet_copy(df, xlsx_filepath):
+    """Write a Parquet sibling of an xlsx output for fast reloading"""
+    parquet_path = xlsx_filepath.replace('.xlsx', '.parquet')
+    try:
+        df.to_parquet(parquet_path, compression='zstd')
+        print(f"✓ Parquet copy: {parquet_path}")
+        return parquet_path
+    except (ImportError, ValueError, OSError) as e:
+        # No parquet engine installed (or unsupported dtypes) - xlsx only
+        print(f"ℹ Skipped Parquet copy: {e}")
+        return None
+
+
+def _is_internal_stage(stem):
+    """Internal pipeline stages can skip xlsx and keep Parquet only"""
+    return stem.endswith('_progress') or os.environ.get('PIPELINE_INTERNAL') == '1'
+
+
 def save_excel(df, filepath, create_backup=True):
-    """Save DataFrame to Excel with backup and versioning"""
+    """
+    Save DataFrame with backup and versioning
+
+    User-facing saves produce xlsx (plus a Parquet sibling when an engine
+    is installed). Pipeline-internal stages - a '_progress' filename
+    suffix or PIPELINE_INTERNAL=1 - are written as Parquet only, which is
+    both far smaller and an order of magnitude faster than xlsx; nobody
+    opens those intermediates in Excel.
+    """
+    # One directory listing instead of a stat call per candidate name;
+    # matters when versioned copies pile up on a network share
+    parent, name = os.path.split(filepath)
+    stem, ext = os.path.splitext(name)
+    if ext == '.xlsx' and _is_internal_stage(stem):
+        ext = '.parquet'
+        name = stem + ext
+    existing = {entry.name for entry in os.scandir(parent or '.')}
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+
     # Create backup if file exists
-    if create_backup and os.path.exists(filepath):
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        backup_path = filepath.replace('.xlsx', f'_backup_{timestamp}.xlsx')
-        os.rename(filepath, backup_path)
-        print(f"📦 Backup created: {backup_path}")
-    
+    if create_backup and name in existing:
+        backup_name = f"{stem}_backup_{timestamp}{ext}"
+        os.rename(filepath, os.path.join(parent, backup_name))
+        existing.discard(name)
+        print(f"📦 Backup created: {os.path.join(parent, backup_name)}")
+
     # Handle file versioning if it already exists
     counter = 1
-    original_filepath = filepath
-    while os.path.exists(filepath):
-        base = original_filepath.replace('.xlsx', '')
-        filepath = f"{base}_{counter}.xlsx"
+    while name in existing:
+        name = f"{stem}_{counter}{ext}"
         counter += 1
-    
+    filepath = os.path.join(parent, name) if parent else name
+
     try:
-        df.to_excel(filepath, index=False)
+        if ext == '.parquet':
+            df.to_parquet(filepath, compression='zstd')
+            print(f"✓ Saved: {filepath}")
+            return filepath
+        write_excel(df, filepath)
         print(f"✓ Saved: {filepath}")
+        write_parquet_copy(df, filepath)
         return filepath
     except Exception as e:
         # Fallback to CSV
-        csv_path = filepath.replace('.xlsx', '.csv')
+        csv_path = os.path.splitext(filepath)[0] + '.csv'
         print(f"✗ Could not save Excel: {e}")
         print(f"  Attempting CSV: {csv_path}")
         df.to_csv(csv_path, index=False)
@@ -66,6 +204,38 @@ def save_excel(df, filepath, create_backup=True):
         return csv_path
 
 
+def align_id_dtypes(new_df, processed_df, id_column='SERVICE_ORDER'):
+    """
+    Cast the id column of both frames to a common hash-friendly dtype
+
+    Excel loads leave ids as object dtype (and the two files can disagree,
+    e.g. int vs str), which makes the anti-join in find_new_service_orders
+    hash Python objects and can miss matches. Prefer int64, falling back
+    to the pandas string dtype for non-numeric ids.
+
+    Args:
+        new_df: DataFrame with all service calls (including new ones)
+        processed_df: DataFrame with already processed calls (may be None)
+        id_column: Column name shared by both frames
+
+    Returns:
+        Tuple (new_df, processed_df) with aligned id dtypes
+    """
+    if new_df is None or processed_df is None or processed_df.empty:
+        return new_df, processed_df
+
+    try:
+        new_ids = pd.to_numeric(new_df[id_column]).astype('int64')
+        old_ids = pd.to_numeric(processed_df[id_column]).astype('int64')
+    except (ValueError, TypeError):
+        new_ids = new_df[id_column].astype('string')
+        old_ids = processed_df[id_column].astype('string')
+
+    new_df[id_column] = new_ids
+    processed_df[id_column] = old_ids
+    return new_df, processed_df
+
+
 def find_new_service_orders(new_df, processed_df, id_column='SERVICE_ORDER'):
     """
     Find SERVICE_ORDERs in new_df that don't exist in processed_df
@@ -81,28 +251,26 @@ def find_new_service_orders(new_df, processed_df, id_column='SERVICE_ORDER'):
     if processed_df is None or processed_df.empty:
         print("ℹ No processed file found. Processing all records.")
         return new_df
-    
-    # Get existing SERVICE_ORDERs
-    existing_orders = set(processed_df[id_column].unique())
-    new_orders = set(new_df[id_column].unique())
-    
-    # Find orders that don't exist in processed file
-    orders_to_process = new_orders - existing_orders
-    
+
+    # Vectorized anti-join: isin hashes the processed ids at C level, with
+    # no Python set of per-value objects materialized
+    mask = ~new_df[id_column].isin(processed_df[id_column])
+    orders_to_process = new_df.loc[mask, id_column].nunique()
+
     print(f"\n📊 Incremental Processing Analysis:")
-    print(f"  Existing orders: {len(existing_orders):,}")
-    print(f"  New orders in file: {len(new_orders):,}")
-    print(f"  Orders to process: {len(orders_to_process):,}")
-    
+    print(f"  Existing orders: {processed_df[id_column].nunique():,}")
+    print(f"  New orders in file: {new_df[id_column].nunique():,}")
+    print(f"  Orders to process: {orders_to_process:,}")
+
     if not orders_to_process:
         print("✓ All service orders already processed!")
         return pd.DataFrame()
-    
+
     # Filter to only new orders
-    new_records_df = new_df[new_df[id_column].isin(orders_to_process)].copy()
-    
+    new_records_df = new_df.loc[mask].copy()
+
     print(f"  New records to process: {len(new_records_df):,}")
-    
+
     return new_records_df
 
 
@@ -119,9 +287,26 @@ def merge_processed_data(existing_df, new_df):
     """
     if existing_df is None or existing_df.empty:
         return new_df
-    
-    # Concatenate
-    combined_df = pd.concat([existing_df, new_df], ignore_index=True)
+
+    # Align column order and dtypes first so the concat neither upcasts
+    # matching columns to object nor copies every block. The union keeps
+    # columns that only the new rows carry (e.g. result columns missing
+    # from an older processed file). Categorical columns are excluded
+    # from the cast: astype to a CategoricalDtype silently turns every
+    # value outside the existing category list into NaN (the new run's
+    # translations and any off-taxonomy labels would be nulled), so
+    # those columns are left for concat's own promotion instead.
+    new_df = new_df.reindex(columns=existing_df.columns.union(new_df.columns, sort=False))
+    dtypes = {
+        col: dtype for col, dtype in existing_df.dtypes.items()
+        if not isinstance(dtype, pd.CategoricalDtype)
+    }
+    try:
+        new_df = new_df.astype(dtypes)
+    except (TypeError, ValueError):
+        pass  # Incompatible columns fall back to pandas' own promotion
+
+    combined_df = pd.concat([existing_df, new_df], ignore_index=True, copy=False)
     
     print(f"\n📊 Merge Results:")
     print(f"  Existing records: {len(existing_df):,}")